@@ -1,5 +1,5 @@
 from sqlalchemy.orm import Session
-from . import models, schemas, database
+from . import models, schemas, database, directory
 import bcrypt
 from fastapi import Depends, HTTPException, Header
 from typing import Optional
@@ -34,6 +34,8 @@ def create_user(db: Session, user: schemas.UserCreate):
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
+    if db_user.role == models.UserRole.VENDEDOR:
+        directory.for_session(db).invalidate()
     return db_user
 
 def get_current_user(db: Session = Depends(database.get_db), user_email: Optional[str] = Header(None, alias="X-User-Email")):
@@ -1,52 +1,347 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, func, inspect, or_, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from . import models, schemas
-from sqlalchemy.orm import Session
+from . import models, schemas, directory, tenancy
+from sqlalchemy.orm import Session, joinedload, noload
+from .write_queue import WriteQueue
+from fastapi import Header, HTTPException
+from datetime import date, datetime, time, timedelta
+from typing import Optional
 import bcrypt
+import os
+import random
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///./indicavende.db"
 
+# Cada tenant tem seu próprio arquivo SQLite em TENANTS_DIR; o tenant "default"
+# continua usando indicavende.db.
+TENANTS_DIR = os.getenv("TENANTS_DIR", "./tenants")
+MAX_OPEN_TENANTS = int(os.getenv("MAX_OPEN_TENANTS", "64"))
+TENANT_IDLE_SECONDS = float(os.getenv("TENANT_IDLE_SECONDS", "600"))
+
+# Com WRITE_COALESCING=1 as escritas de leads passam por uma fila com um único
+# writer, que agrupa vários inserts/updates em um só commit.
+WRITE_COALESCING = os.getenv("WRITE_COALESCING", "0") == "1"
+WRITE_BATCH_SIZE = int(os.getenv("WRITE_BATCH_SIZE", "64"))
+WRITE_BATCH_DELAY_MS = float(os.getenv("WRITE_BATCH_DELAY_MS", "0"))
+
 engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-def get_db():
-    db = SessionLocal()
+def _new_write_queue(bind):
+    return WriteQueue(
+        sessionmaker(autocommit=False, autoflush=False, bind=bind),
+        WRITE_BATCH_SIZE,
+        WRITE_BATCH_DELAY_MS / 1000
+    )
+
+write_queue = _new_write_queue(engine) if WRITE_COALESCING else None
+
+# Chaves de idempotência valem por IDEMPOTENCY_TTL_HOURS; as expiradas são
+# removidas aos poucos, em uma fração das escritas que usam chave.
+IDEMPOTENCY_TTL_HOURS = float(os.getenv("IDEMPOTENCY_TTL_HOURS", "24"))
+IDEMPOTENCY_PRUNE_PROBABILITY = 0.01
+
+class VersionConflict(Exception):
+    def __init__(self, current_version: int):
+        super().__init__(f"Lead está na versão {current_version}")
+        self.current_version = current_version
+
+LEAD_SORT_FIELDS = {
+    "id": models.Lead.id,
+    "created_at": models.Lead.created_at,
+    "updated_at": models.Lead.updated_at,
+    "client_name": models.Lead.client_name,
+    "status": models.Lead.status,
+}
+
+LEAD_EXPANSIONS = {
+    "indicador": models.Lead.indicador,
+    "vendedor": models.Lead.vendedor,
+}
+
+def migrate(bind):
+    models.Base.metadata.create_all(bind=bind)
+    # create_all não cria colunas nem índices novos em tabelas que já existem
+    inspector = inspect(bind)
+    with bind.begin() as conn:
+        for table in models.Base.metadata.sorted_tables:
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    conn.execute(text(_add_column_ddl(bind, table, column)))
+    for table in models.Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=bind, checkfirst=True)
+
+def _add_column_ddl(bind, table, column):
+    # ADD COLUMN só aceita defaults constantes, e uma coluna NOT NULL precisa
+    # de um para preencher as linhas existentes. Qualquer outro caso exige
+    # uma migração escrita à mão, em vez de DDL inválido ou mais fraco.
+    name = f"{table.name}.{column.name}"
+    if column.primary_key or column.unique:
+        raise RuntimeError(f"Migração automática não suporta chave primária/unique em {name}")
+    default = column.server_default
+    if default is not None and not isinstance(getattr(default, "arg", None), str):
+        raise RuntimeError(f"Migração automática só aceita server_default literal em {name}")
+    if not column.nullable and default is None:
+        raise RuntimeError(f"Coluna NOT NULL {name} precisa de server_default literal para ser adicionada")
+    
+    ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(dialect=bind.dialect)}"
+    if not column.nullable:
+        ddl += " NOT NULL"
+    if default is not None:
+        ddl += f" DEFAULT {bind.dialect.ddl_compiler(bind.dialect, None).get_column_default_string(column)}"
+    return ddl
+
+router = tenancy.TenantRouter(
+    TENANTS_DIR,
+    migrate,
+    default=tenancy.Shard(tenancy.DEFAULT_TENANT, engine, write_queue, directory.vendedores),
+    max_open=MAX_OPEN_TENANTS,
+    idle_seconds=TENANT_IDLE_SECONDS,
+    write_queue_factory=_new_write_queue if WRITE_COALESCING else None
+)
+
+def get_db(tenant: Optional[str] = Header(None, alias="X-Tenant")):
+    tenant = tenant or tenancy.DEFAULT_TENANT
+    if not tenancy.TENANT_ID.match(tenant):
+        raise HTTPException(status_code=400, detail="Tenant inválido")
+    try:
+        shard = router.get(tenant)
+    except tenancy.TenantUnavailable:
+        raise HTTPException(status_code=503, detail="Tenant em manutenção", headers={"Retry-After": "5"})
+    if shard is None:
+        raise HTTPException(status_code=404, detail="Tenant não encontrado")
+    db = shard.SessionLocal()
     try:
         yield db
     finally:
         db.close()
+        router.release(shard)
 
-def create_lead(db: Session, lead: schemas.LeadCreate, indicador_id: int):
-    db_lead = models.Lead(
-        **lead.dict(),
-        indicador_id=indicador_id
+def _write(db: Session, op):
+    # Sessões criadas fora do roteador (scripts) usam a fila do tenant padrão
+    queue = db.info.get("write_queue", write_queue)
+    if queue is None:
+        try:
+            finish = op(db)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        return finish()
+    return queue.submit(op).result()
+
+def _idempotency_cutoff():
+    return datetime.utcnow() - timedelta(hours=IDEMPOTENCY_TTL_HOURS)
+
+def get_idempotency_key(db: Session, user_id: int, key: str):
+    return (
+        db.query(models.IdempotencyKey)
+        .filter(
+            models.IdempotencyKey.user_id == user_id,
+            models.IdempotencyKey.key == key,
+            models.IdempotencyKey.created_at >= _idempotency_cutoff()
+        )
+        .first()
     )
-    db.add(db_lead)
-    db.commit()
-    db.refresh(db_lead)
-    return db_lead
 
-def get_all_leads(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Lead).offset(skip).limit(limit).all()
+def _save_idempotency_key(session: Session, user_id: int, key: str, fingerprint: str, response: str, etag: Optional[str] = None):
+    cutoff = _idempotency_cutoff()
+    expired = session.query(models.IdempotencyKey).filter(models.IdempotencyKey.created_at < cutoff)
+    if random.random() < IDEMPOTENCY_PRUNE_PROBABILITY:
+        expired.delete(synchronize_session=False)
+    else:
+        # Libera só a chave atual, caso ela tenha expirado e esteja sendo reutilizada
+        expired.filter(
+            models.IdempotencyKey.user_id == user_id,
+            models.IdempotencyKey.key == key
+        ).delete(synchronize_session=False)
+    session.add(models.IdempotencyKey(
+        key=key,
+        user_id=user_id,
+        fingerprint=fingerprint,
+        status_code=200,
+        response_body=response,
+        etag=etag
+    ))
+    session.flush()
 
-def get_indicador_leads(db: Session, indicador_id: int):
-    return db.query(models.Lead).filter(models.Lead.indicador_id == indicador_id).all()
+def create_lead(db: Session, lead: schemas.LeadCreate, indicador_id: int, idempotency_key: Optional[str] = None, fingerprint: Optional[str] = None):
+    # O contador de leads abertos é incrementado antes da escrita (e desfeito
+    # em caso de erro) para que atribuições automáticas concorrentes se espalhem.
+    vendedor_id = lead.vendedor_id
+    if vendedor_id is None:
+        vendedor_id = directory.for_session(db).assign(db)
+        if vendedor_id is None:
+            return None
+    else:
+        directory.for_session(db).adjust(vendedor_id, 1)
+    
+    def op(session: Session):
+        db_lead = models.Lead(
+            **lead.dict(exclude={"vendedor_id"}),
+            vendedor_id=vendedor_id,
+            indicador_id=indicador_id
+        )
+        session.add(db_lead)
+        session.flush()
+        lead_id = db_lead.id
+        if idempotency_key:
+            # A resposta é gravada na mesma transação do lead: uma chave
+            # repetida viola a constraint única e nenhum lead duplicado é criado.
+            session.refresh(db_lead)
+            response = schemas.LeadResponse.model_validate(db_lead).model_dump_json()
+            _save_idempotency_key(session, indicador_id, idempotency_key, fingerprint, response, f'"{db_lead.version}"')
+        return lambda: lead_id
 
-def get_vendedor_leads(db: Session, vendedor_id: int):
-    return db.query(models.Lead).filter(models.Lead.vendedor_id == vendedor_id).all()
+    try:
+        lead_id = _write(db, op)
+    except Exception:
+        directory.for_session(db).adjust(vendedor_id, -1)
+        raise
+    return db.get(models.Lead, lead_id)
 
-def update_lead_status(db: Session, lead_id: int, lead_update: schemas.LeadUpdate):
-    db_lead = db.query(models.Lead).filter(models.Lead.id == lead_id).first()
-    if not db_lead:
+def _lead_options(expand=()):
+    # Relações pedidas vêm no mesmo SELECT via JOIN; as demais nunca são
+    # carregadas, para que a serialização não dispare um lazy load por linha.
+    return [
+        joinedload(relationship) if name in expand else noload(relationship)
+        for name, relationship in LEAD_EXPANSIONS.items()
+    ]
+
+def get_all_leads(db: Session, skip: int = 0, limit: int = 100, expand=()):
+    return db.query(models.Lead).options(*_lead_options(expand)).offset(skip).limit(limit).all()
+
+def get_indicador_leads(db: Session, indicador_id: int, expand=()):
+    return db.query(models.Lead).options(*_lead_options(expand)).filter(models.Lead.indicador_id == indicador_id).all()
+
+def get_vendedor_leads(db: Session, vendedor_id: int, expand=()):
+    return db.query(models.Lead).options(*_lead_options(expand)).filter(models.Lead.vendedor_id == vendedor_id).all()
+
+def get_lead(db: Session, lead_id: int):
+    return db.query(models.Lead).options(*_lead_options()).filter(models.Lead.id == lead_id).first()
+
+def update_lead_status(db: Session, lead_id: int, lead_update: schemas.LeadUpdate, expected_version: Optional[int] = None):
+    def op(session: Session):
+        current = (
+            session.query(models.Lead.vendedor_id, models.Lead.status, models.Lead.version)
+            .filter(models.Lead.id == lead_id)
+            .first()
+        )
+        if not current:
+            return lambda: None
+        if expected_version is not None and current.version != expected_version:
+            raise VersionConflict(current.version)
+        
+        values = lead_update.dict(exclude_unset=True)
+        values["version"] = current.version + 1
+        # Compare-and-swap: só grava se ninguém alterou o lead desde a leitura
+        updated = (
+            session.query(models.Lead)
+            .filter(models.Lead.id == lead_id, models.Lead.version == current.version)
+            .update(values, synchronize_session=False)
+        )
+        if not updated:
+            raise VersionConflict(current.version + 1)
+        delta = directory.is_open(values.get("status", current.status)) - directory.is_open(current.status)
+        
+        def finish():
+            if delta:
+                directory.for_session(db).adjust(current.vendedor_id, delta)
+            return lead_id
+        return finish
+
+    if _write(db, op) is None:
         return None
+    return db.get(models.Lead, lead_id)
+
+def _lead_filters(status=None, vendedor_id=None, indicador_id=None, date_from: Optional[date] = None, date_to: Optional[date] = None, q: Optional[str] = None):
+    filters = []
+    if status:
+        filters.append(models.Lead.status == status)
+    if vendedor_id:
+        filters.append(models.Lead.vendedor_id == vendedor_id)
+    if indicador_id:
+        filters.append(models.Lead.indicador_id == indicador_id)
+    if date_from:
+        filters.append(models.Lead.created_at >= datetime.combine(date_from, time.min))
+    if date_to:
+        filters.append(models.Lead.created_at < datetime.combine(date_to + timedelta(days=1), time.min))
+    if q:
+        like = f"%{q}%"
+        filters.append(or_(
+            models.Lead.client_name.ilike(like),
+            models.Lead.phone.like(like),
+            models.Lead.city_state.ilike(like)
+        ))
+    return filters
+
+def search_leads(db: Session, page: int = 1, page_size: int = 50, sort: str = "created_at", order: str = "desc", expand=(), **filter_args):
+    filters = _lead_filters(**filter_args)
+    total = db.query(func.count(models.Lead.id)).filter(*filters).scalar()
     
-    for field, value in lead_update.dict(exclude_unset=True).items():
-        setattr(db_lead, field, value)
+    column = LEAD_SORT_FIELDS.get(sort, models.Lead.created_at)
+    if order == "asc":
+        order_by = (column.asc(), models.Lead.id.asc())
+    else:
+        order_by = (column.desc(), models.Lead.id.desc())
     
-    db.commit()
-    db.refresh(db_lead)
-    return db_lead
+    items = (
+        db.query(models.Lead)
+        .options(*_lead_options(expand))
+        .filter(*filters)
+        .order_by(*order_by)
+        .offset((page - 1) * page_size)
+        .limit(page_size)
+        .all()
+    )
+    return items, total
+
+def count_leads_by_status(db: Session, vendedor_id: Optional[int] = None, indicador_id: Optional[int] = None):
+    filters = _lead_filters(vendedor_id=vendedor_id, indicador_id=indicador_id)
+    rows = (
+        db.query(models.Lead.status, func.count(models.Lead.id))
+        .filter(*filters)
+        .group_by(models.Lead.status)
+        .all()
+    )
+    return {status.value: count for status, count in rows}
+
+def bulk_update_leads(db: Session, lead_update: schemas.LeadBulkUpdate):
+    values = lead_update.dict(exclude_unset=True, exclude_none=True, exclude={"lead_ids"})
+    if not values:
+        return 0
+    values["version"] = models.Lead.version + 1
+    
+    def op(session: Session):
+        # Estado anterior das linhas afetadas, para ajustar os contadores de leads abertos
+        rows = (
+            session.query(models.Lead.vendedor_id, models.Lead.status)
+            .filter(models.Lead.id.in_(lead_update.lead_ids))
+            .all()
+        )
+        updated = (
+            session.query(models.Lead)
+            .filter(models.Lead.id.in_(lead_update.lead_ids))
+            .update(values, synchronize_session=False)
+        )
+        deltas = {}
+        for vendedor_id, status in rows:
+            new_vendedor_id = values.get("vendedor_id", vendedor_id)
+            new_status = values.get("status", status)
+            deltas[vendedor_id] = deltas.get(vendedor_id, 0) - directory.is_open(status)
+            deltas[new_vendedor_id] = deltas.get(new_vendedor_id, 0) + directory.is_open(new_status)
+        
+        def finish():
+            for vendedor_id, delta in deltas.items():
+                if delta:
+                    directory.for_session(db).adjust(vendedor_id, delta)
+            return updated
+        return finish
+    
+    return _write(db, op)
 
 def get_all_users(db: Session):
     return db.query(models.User).all()
@@ -54,5 +349,24 @@ def get_all_users(db: Session):
 def get_vendedores(db: Session):
     return db.query(models.User).filter(models.User.role == models.UserRole.VENDEDOR).all()
 
+def search_users(db: Session, page: int = 1, page_size: int = 50, role=None, q: Optional[str] = None):
+    filters = []
+    if role:
+        filters.append(models.User.role == role)
+    if q:
+        like = f"%{q}%"
+        filters.append(or_(models.User.name.ilike(like), models.User.email.ilike(like)))
+    
+    total = db.query(func.count(models.User.id)).filter(*filters).scalar()
+    items = (
+        db.query(models.User)
+        .filter(*filters)
+        .order_by(models.User.name, models.User.id)
+        .offset((page - 1) * page_size)
+        .limit(page_size)
+        .all()
+    )
+    return items, total
+
 def get_user_by_email(db: Session, email: str):
     return db.query(models.User).filter(models.User.email == email).first()
@@ -0,0 +1,123 @@
+import heapq
+import threading
+from bisect import bisect_left
+from typing import Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from . import models
+
+CLOSED_STATUSES = {models.LeadStatus.FECHADO, models.LeadStatus.PERDIDO}
+
+
+def is_open(status) -> bool:
+    return models.LeadStatus(status) not in CLOSED_STATUSES
+
+
+class VendedorDirectory:
+    # Cache em memória dos vendedores e de quantos leads abertos cada um tem.
+    # Os contadores são carregados com uma única agregação e depois mantidos
+    # incrementalmente a cada criação/mudança de status de lead.
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._vendedores = None
+        self._names = []
+        self._open_leads = None
+        self._heap = []
+
+    def invalidate(self):
+        with self._lock:
+            self._vendedores = None
+
+    def _ensure_loaded(self, db: Session):
+        # Sempre chamado com o lock adquirido
+        if self._vendedores is None:
+            rows = db.query(models.User).filter(models.User.role == models.UserRole.VENDEDOR).all()
+            vendedores = {
+                u.id: {"id": u.id, "name": u.name, "email": u.email, "role": u.role, "created_at": u.created_at}
+                for u in rows
+            }
+            if self._open_leads is None:
+                counts = (
+                    db.query(models.Lead.vendedor_id, func.count(models.Lead.id))
+                    .filter(models.Lead.status.notin_(CLOSED_STATUSES))
+                    .group_by(models.Lead.vendedor_id)
+                    .all()
+                )
+                self._open_leads = dict(counts)
+            self._names = sorted((v["name"].casefold(), v["id"]) for v in vendedores.values())
+            self._vendedores = vendedores
+            self._rebuild_heap()
+
+    def _rebuild_heap(self):
+        self._heap = [(self._open_leads.get(i, 0), i) for i in self._vendedores]
+        heapq.heapify(self._heap)
+
+    def get(self, db: Session, vendedor_id: int) -> Optional[dict]:
+        with self._lock:
+            self._ensure_loaded(db)
+            return self._vendedores.get(vendedor_id)
+
+    def search(self, db: Session, prefix: Optional[str] = None, limit: Optional[int] = None):
+        with self._lock:
+            self._ensure_loaded(db)
+            if not prefix:
+                ids = [i for _, i in self._names[:limit]]
+            else:
+                prefix = prefix.casefold()
+                ids = []
+                pos = bisect_left(self._names, (prefix,))
+                while pos < len(self._names) and self._names[pos][0].startswith(prefix):
+                    ids.append(self._names[pos][1])
+                    if limit and len(ids) >= limit:
+                        break
+                    pos += 1
+            return [self._vendedores[i] for i in ids]
+
+    def open_leads(self, db: Session, vendedor_id: int) -> int:
+        with self._lock:
+            self._ensure_loaded(db)
+            return self._open_leads.get(vendedor_id, 0)
+
+    def adjust(self, vendedor_id: int, delta: int):
+        with self._lock:
+            if self._open_leads is None:
+                return
+            count = self._open_leads.get(vendedor_id, 0) + delta
+            self._open_leads[vendedor_id] = count
+            if self._vendedores is not None and vendedor_id in self._vendedores:
+                heapq.heappush(self._heap, (count, vendedor_id))
+                # Entradas antigas ficam no heap até chegarem ao topo; reconstrói
+                # quando elas passam a dominar.
+                if len(self._heap) > 4 * len(self._vendedores) + 64:
+                    self._rebuild_heap()
+
+    def _peek_least_loaded(self):
+        while self._heap:
+            count, vendedor_id = self._heap[0]
+            if vendedor_id in self._vendedores and self._open_leads.get(vendedor_id, 0) == count:
+                return vendedor_id
+            heapq.heappop(self._heap)
+        return None
+
+    def least_loaded(self, db: Session) -> Optional[int]:
+        with self._lock:
+            self._ensure_loaded(db)
+            return self._peek_least_loaded()
+
+    def assign(self, db: Session) -> Optional[int]:
+        # Escolhe o vendedor com menos leads abertos e já reserva o lead para
+        # ele, para que atribuições concorrentes se distribuam.
+        with self._lock:
+            self._ensure_loaded(db)
+            vendedor_id = self._peek_least_loaded()
+            if vendedor_id is not None:
+                self.adjust(vendedor_id, 1)
+            return vendedor_id
+
+
+vendedores = VendedorDirectory()
+
+def for_session(db: Session) -> VendedorDirectory:
+    return db.info.get("vendedores", vendedores)
@@ -1,16 +1,24 @@
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Query, Header, Response
+from fastapi.responses import FileResponse
+from sqlalchemy.exc import IntegrityError
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
-from typing import List
+from datetime import date
+from typing import List, Optional
+import hashlib
 import uvicorn
 
-from . import models, schemas, auth, database
-from .database import engine, get_db
-
-models.Base.metadata.create_all(bind=engine)
+from . import models, schemas, auth, database, directory, ratelimit, profiling, tenancy
+from .database import get_db
 
 app = FastAPI(title="IndicaVende API", version="1.0.0")
 
+# Limite de página nas buscas paginadas; mantém o OFFSET dentro do inteiro do SQLite
+MAX_PAGE = 100000
+
+if profiling.ENABLED:
+    profiling.install(app)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -19,7 +27,20 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-@app.post("/auth/login", response_model=schemas.UserResponse)
+@app.on_event("shutdown")
+def close_tenants():
+    database.router.close_all()
+
+def parse_expand(expand: Optional[str] = Query(None, description="Relações a incluir, ex.: vendedor,indicador")):
+    if not expand:
+        return set()
+    names = {name.strip() for name in expand.split(",") if name.strip()}
+    invalid = names - set(database.LEAD_EXPANSIONS)
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"expand inválido: {', '.join(sorted(invalid))}")
+    return names
+
+@app.post("/auth/login", response_model=schemas.UserResponse, dependencies=[Depends(ratelimit.limit_login)])
 def login(credentials: schemas.LoginRequest, db: Session = Depends(get_db)):
     user = auth.authenticate_user(db, credentials.email, credentials.password)
     if not user:
@@ -31,49 +52,257 @@ def register(user_data: schemas.UserCreate, db: Session = Depends(get_db)):
     return auth.create_user(db, user_data)
 
 @app.post("/leads/", response_model=schemas.LeadResponse)
-def create_lead(lead: schemas.LeadCreate, db: Session = Depends(get_db), current_user: schemas.UserResponse = Depends(auth.get_current_user)):
-    return database.create_lead(db, lead, current_user.id)
+def create_lead(
+    lead: schemas.LeadCreate,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
+    db: Session = Depends(get_db),
+    current_user: schemas.UserResponse = Depends(ratelimit.limit_writes)
+):
+    fingerprint = None
+    if idempotency_key:
+        fingerprint = hashlib.sha256(lead.model_dump_json().encode()).hexdigest()
+        stored = database.get_idempotency_key(db, current_user.id, idempotency_key)
+        if stored:
+            return replay_idempotent_response(stored, fingerprint)
+    
+    if lead.vendedor_id is not None and directory.for_session(db).get(db, lead.vendedor_id) is None:
+        raise HTTPException(status_code=400, detail="Vendedor inválido")
+    try:
+        db_lead = database.create_lead(db, lead, current_user.id, idempotency_key, fingerprint)
+    except IntegrityError:
+        # Outra requisição com a mesma chave gravou primeiro
+        stored = idempotency_key and database.get_idempotency_key(db, current_user.id, idempotency_key)
+        if not stored:
+            raise
+        return replay_idempotent_response(stored, fingerprint)
+    if db_lead is None:
+        raise HTTPException(status_code=400, detail="Nenhum vendedor disponível")
+    response.headers["ETag"] = f'"{db_lead.version}"'
+    return db_lead
+
+def replay_idempotent_response(stored: models.IdempotencyKey, fingerprint: str):
+    if stored.fingerprint != fingerprint:
+        raise HTTPException(status_code=422, detail="Idempotency-Key já usada com outro conteúdo")
+    headers = {"Idempotent-Replayed": "true"}
+    if stored.etag:
+        headers["ETag"] = stored.etag
+    return Response(
+        content=stored.response_body,
+        status_code=stored.status_code,
+        media_type="application/json",
+        headers=headers
+    )
 
-@app.get("/leads/", response_model=List[schemas.LeadResponse])
+def parse_if_match(if_match: Optional[str] = Header(None, alias="If-Match")):
+    if if_match is None or if_match.strip() == "*":
+        return None
+    value = if_match.strip()
+    if value.startswith("W/"):
+        value = value[2:]
+    try:
+        return int(value.strip('"'))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="If-Match deve conter a versão do lead")
+
+@app.get("/leads/", response_model=List[schemas.LeadExpandedResponse])
 def get_leads(
     skip: int = 0, 
     limit: int = 100, 
+    expand: set = Depends(parse_expand),
     db: Session = Depends(get_db),
-    current_user: schemas.UserResponse = Depends(auth.get_current_user)
+    current_user: schemas.UserResponse = Depends(ratelimit.limit_reads)
 ):
     if current_user.role == "gestor":
-        return database.get_all_leads(db, skip, limit)
+        return database.get_all_leads(db, skip, limit, expand)
     elif current_user.role == "vendedor":
-        return database.get_vendedor_leads(db, current_user.id)
+        return database.get_vendedor_leads(db, current_user.id, expand)
     else:
-        return database.get_indicador_leads(db, current_user.id)
+        return database.get_indicador_leads(db, current_user.id, expand)
+
+@app.get("/leads/search", response_model=schemas.LeadPage)
+def search_leads(
+    page: int = Query(1, ge=1, le=MAX_PAGE),
+    page_size: int = Query(50, ge=1, le=200),
+    sort: str = Query("created_at", pattern="^(" + "|".join(database.LEAD_SORT_FIELDS) + ")$"),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    status: Optional[models.LeadStatus] = None,
+    vendedor_id: Optional[int] = None,
+    indicador_id: Optional[int] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    q: Optional[str] = Query(None, max_length=100),
+    expand: set = Depends(parse_expand),
+    db: Session = Depends(get_db),
+    current_user: schemas.UserResponse = Depends(ratelimit.limit_reads)
+):
+    # Vendedores e indicadores só enxergam os próprios leads
+    if current_user.role == "vendedor":
+        vendedor_id = current_user.id
+    elif current_user.role == "indicador":
+        indicador_id = current_user.id
+    
+    items, total = database.search_leads(
+        db, page, page_size, sort, order, expand,
+        status=status, vendedor_id=vendedor_id, indicador_id=indicador_id,
+        date_from=date_from, date_to=date_to, q=q
+    )
+    return {"items": items, "total": total, "page": page, "page_size": page_size}
+
+@app.get("/leads/counts")
+def count_leads_by_status(
+    db: Session = Depends(get_db),
+    current_user: schemas.UserResponse = Depends(ratelimit.limit_reads)
+):
+    if current_user.role == "vendedor":
+        return database.count_leads_by_status(db, vendedor_id=current_user.id)
+    elif current_user.role == "indicador":
+        return database.count_leads_by_status(db, indicador_id=current_user.id)
+    return database.count_leads_by_status(db)
+
+@app.put("/leads/bulk", response_model=schemas.BulkUpdateResult)
+def bulk_update_leads(
+    lead_update: schemas.LeadBulkUpdate,
+    db: Session = Depends(get_db),
+    current_user: schemas.UserResponse = Depends(ratelimit.limit_writes)
+):
+    if current_user.role != "gestor":
+        raise HTTPException(status_code=403, detail="Sem permissão para atualizar leads")
+    if lead_update.vendedor_id is not None:
+        if directory.for_session(db).get(db, lead_update.vendedor_id) is None:
+            raise HTTPException(status_code=400, detail="Vendedor inválido")
+    return {"updated": database.bulk_update_leads(db, lead_update)}
+
+@app.get("/leads/{lead_id}", response_model=schemas.LeadResponse)
+def get_lead(
+    lead_id: int,
+    response: Response,
+    db: Session = Depends(get_db),
+    current_user: schemas.UserResponse = Depends(ratelimit.limit_reads)
+):
+    db_lead = database.get_lead(db, lead_id)
+    # Cada perfil só enxerga os leads que aparecem na sua listagem
+    visible = db_lead is not None and (
+        current_user.role == "gestor"
+        or (current_user.role == "vendedor" and db_lead.vendedor_id == current_user.id)
+        or (current_user.role == "indicador" and db_lead.indicador_id == current_user.id)
+    )
+    if not visible:
+        raise HTTPException(status_code=404, detail="Lead não encontrado")
+    response.headers["ETag"] = f'"{db_lead.version}"'
+    return db_lead
 
 @app.put("/leads/{lead_id}", response_model=schemas.LeadResponse)
 def update_lead_status(
     lead_id: int, 
     lead_update: schemas.LeadUpdate, 
+    response: Response,
+    expected_version: Optional[int] = Depends(parse_if_match),
     db: Session = Depends(get_db),
-    current_user: schemas.UserResponse = Depends(auth.get_current_user)
+    current_user: schemas.UserResponse = Depends(ratelimit.limit_writes)
 ):
     if current_user.role not in ["vendedor", "gestor"]:
         raise HTTPException(status_code=403, detail="Sem permissão para atualizar leads")
-    return database.update_lead_status(db, lead_id, lead_update)
+    try:
+        db_lead = database.update_lead_status(db, lead_id, lead_update, expected_version)
+    except database.VersionConflict as e:
+        raise HTTPException(
+            status_code=409,
+            detail="Lead alterado por outra requisição; recarregue e tente novamente",
+            headers={"ETag": f'"{e.current_version}"'}
+        )
+    if db_lead is None:
+        raise HTTPException(status_code=404, detail="Lead não encontrado")
+    response.headers["ETag"] = f'"{db_lead.version}"'
+    return db_lead
 
 @app.get("/users/", response_model=List[schemas.UserResponse])
 def get_users(
     db: Session = Depends(get_db),
-    current_user: schemas.UserResponse = Depends(auth.get_current_user)
+    current_user: schemas.UserResponse = Depends(ratelimit.limit_reads)
 ):
     if current_user.role != "gestor":
         raise HTTPException(status_code=403, detail="Acesso negado")
     return database.get_all_users(db)
 
+@app.get("/users/search", response_model=schemas.UserPage)
+def search_users(
+    page: int = Query(1, ge=1, le=MAX_PAGE),
+    page_size: int = Query(50, ge=1, le=500),
+    role: Optional[models.UserRole] = None,
+    q: Optional[str] = Query(None, max_length=100),
+    db: Session = Depends(get_db),
+    current_user: schemas.UserResponse = Depends(ratelimit.limit_reads)
+):
+    if current_user.role != "gestor":
+        raise HTTPException(status_code=403, detail="Acesso negado")
+    items, total = database.search_users(db, page, page_size, role=role, q=q)
+    return {"items": items, "total": total, "page": page, "page_size": page_size}
+
 @app.get("/vendedores/", response_model=List[schemas.UserResponse])
 def get_vendedores(
+    q: Optional[str] = Query(None, max_length=100, description="Prefixo do nome"),
+    limit: Optional[int] = Query(None, ge=1, le=500),
     db: Session = Depends(get_db),
-    current_user: schemas.UserResponse = Depends(auth.get_current_user)
+    current_user: schemas.UserResponse = Depends(ratelimit.limit_reads)
 ):
-    return database.get_vendedores(db)
+    return directory.for_session(db).search(db, q, limit)
+
+@app.get("/vendedores/sugerido", response_model=schemas.VendedorSuggestion)
+def suggest_vendedor(
+    db: Session = Depends(get_db),
+    current_user: schemas.UserResponse = Depends(ratelimit.limit_reads)
+):
+    vendedores = directory.for_session(db)
+    vendedor_id = vendedores.least_loaded(db)
+    if vendedor_id is None:
+        raise HTTPException(status_code=404, detail="Nenhum vendedor disponível")
+    return {**vendedores.get(db, vendedor_id), "open_leads": vendedores.open_leads(db, vendedor_id)}
+
+def require_admin(db: Session = Depends(get_db), current_user: schemas.UserResponse = Depends(auth.get_current_user)):
+    # As rotas /debug expõem dados de todos os tenants (nomes, limites, perfis
+    # com SQL): só o gestor do tenant padrão pode usá-las.
+    if current_user.role != "gestor" or db.info.get("tenant", tenancy.DEFAULT_TENANT) != tenancy.DEFAULT_TENANT:
+        raise HTTPException(status_code=403, detail="Acesso negado")
+    return current_user
+
+@app.get("/debug/limits")
+def get_limiter_stats(current_user: schemas.UserResponse = Depends(require_admin)):
+    return ratelimit.stats()
+
+@app.get("/debug/tenants")
+def get_tenant_stats(current_user: schemas.UserResponse = Depends(require_admin)):
+    return database.router.stats()
+
+@app.post("/debug/tenants/{tenant_id}/move")
+def move_tenant(
+    tenant_id: str,
+    move: schemas.TenantMove,
+    current_user: schemas.UserResponse = Depends(require_admin)
+):
+    for name in (tenant_id, move.new_name):
+        if not tenancy.TENANT_ID.match(name) or name == tenancy.DEFAULT_TENANT:
+            raise HTTPException(status_code=400, detail=f"Tenant inválido: {name}")
+    try:
+        path = database.router.move(tenant_id, move.new_name)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Tenant não encontrado")
+    except FileExistsError:
+        raise HTTPException(status_code=409, detail="Já existe um tenant com esse nome")
+    except tenancy.TenantUnavailable:
+        raise HTTPException(status_code=503, detail="Tenant ocupado, tente novamente", headers={"Retry-After": "5"})
+    return {"tenant": move.new_name, "path": path}
+
+@app.get("/debug/profiles")
+def list_profiles(current_user: schemas.UserResponse = Depends(require_admin)):
+    return profiling.store.list()
+
+@app.get("/debug/profiles/{profile_id}")
+def download_profile(profile_id: str, current_user: schemas.UserResponse = Depends(require_admin)):
+    path = profiling.store.stats_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Perfil não encontrado")
+    return FileResponse(path, media_type="application/octet-stream", filename=f"{profile_id}.prof")
 
 @app.post("/seed")
 def seed_database(db: Session = Depends(get_db)):
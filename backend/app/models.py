@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Enum
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Enum, Index, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -22,10 +22,10 @@ class User(Base):
     __tablename__ = "users"
     
     id = Column(Integer, primary_key=True, index=True)
-    name = Column(String(100), nullable=False)
+    name = Column(String(100), nullable=False, index=True)
     email = Column(String(100), unique=True, index=True, nullable=False)
     password = Column(String(255), nullable=False)
-    role = Column(Enum(UserRole), nullable=False)
+    role = Column(Enum(UserRole), nullable=False, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
 class Lead(Base):
@@ -36,13 +36,37 @@ class Lead(Base):
     phone = Column(String(20), nullable=False)
     city_state = Column(String(100), nullable=False)
     observation = Column(Text)
-    status = Column(Enum(LeadStatus), default=LeadStatus.NOVO)
+    status = Column(Enum(LeadStatus), default=LeadStatus.NOVO, index=True)
     
     indicador_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     vendedor_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Incrementada a cada escrita; usada no If-Match para controle otimista de concorrência
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    
+    # Índices compostos para as listagens paginadas por vendedor/indicador e status
+    __table_args__ = (
+        Index("ix_leads_vendedor_status", "vendedor_id", "status"),
+        Index("ix_leads_indicador_status", "indicador_id", "status"),
+    )
     
     indicador = relationship("User", foreign_keys=[indicador_id])
     vendedor = relationship("User", foreign_keys=[vendedor_id])
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+    
+    id = Column(Integer, primary_key=True)
+    key = Column(String(255), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    fingerprint = Column(String(64), nullable=False)
+    status_code = Column(Integer, nullable=False)
+    response_body = Column(Text, nullable=False)
+    etag = Column(String(64))
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    
+    __table_args__ = (
+        UniqueConstraint("user_id", "key", name="uq_idempotency_keys_user_key"),
+    )
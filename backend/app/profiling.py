@@ -0,0 +1,161 @@
+import cProfile
+import functools
+import inspect
+import json
+import os
+import random
+import re
+import secrets
+import threading
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Optional
+
+from fastapi import FastAPI, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Desligado por padrão: sem PROFILING_ENABLED=1 nada deste módulo é instalado no app
+ENABLED = os.getenv("PROFILING_ENABLED", "0") == "1"
+TOKEN = os.getenv("PROFILING_TOKEN")
+SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+PROFILE_DIR = os.getenv("PROFILING_DIR", "./profiles")
+MAX_PROFILES = int(os.getenv("PROFILING_MAX_PROFILES", "50"))
+HEADER = "X-Profile"
+
+_PROFILE_ID = re.compile(r"^[0-9]{8}T[0-9]{6}-[0-9a-f]{8}$")
+
+
+class RequestProfile:
+    def __init__(self):
+        self.profiler = None
+        self.statements = []
+
+
+_current: ContextVar[Optional[RequestProfile]] = ContextVar("request_profile", default=None)
+
+
+class ProfileStore:
+    def __init__(self, directory: str, max_profiles: int):
+        self.directory = directory
+        self.max_profiles = max_profiles
+        self._lock = threading.Lock()
+
+    def _path(self, profile_id: str, ext: str):
+        return os.path.join(self.directory, f"{profile_id}.{ext}")
+
+    def save(self, profile: RequestProfile, meta: dict):
+        os.makedirs(self.directory, exist_ok=True)
+        profile_id = f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S}-{secrets.token_hex(4)}"
+        meta = dict(meta, id=profile_id, statements=profile.statements, has_stats=profile.profiler is not None)
+        with self._lock:
+            if profile.profiler is not None:
+                profile.profiler.dump_stats(self._path(profile_id, "prof"))
+            with open(self._path(profile_id, "json"), "w") as f:
+                json.dump(meta, f)
+            # Ring buffer: descarta os perfis mais antigos
+            for old in self._ids()[self.max_profiles:]:
+                for ext in ("json", "prof"):
+                    if os.path.exists(self._path(old, ext)):
+                        os.remove(self._path(old, ext))
+        return profile_id
+
+    def _ids(self):
+        if not os.path.isdir(self.directory):
+            return []
+        ids = [name[:-5] for name in os.listdir(self.directory) if name.endswith(".json")]
+        return sorted(ids, reverse=True)
+
+    def list(self):
+        profiles = []
+        for profile_id in self._ids():
+            try:
+                with open(self._path(profile_id, "json")) as f:
+                    profiles.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return profiles
+
+    def stats_path(self, profile_id: str):
+        if not _PROFILE_ID.match(profile_id):
+            return None
+        path = self._path(profile_id, "prof")
+        return path if os.path.exists(path) else None
+
+
+store = ProfileStore(PROFILE_DIR, MAX_PROFILES)
+
+
+def _profiled(endpoint):
+    # Só endpoints síncronos: eles rodam no threadpool, e o cProfile precisa
+    # ser ligado na mesma thread que executa o handler.
+    if inspect.iscoroutinefunction(endpoint):
+        return endpoint
+
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        profile = _current.get()
+        if profile is None:
+            return endpoint(*args, **kwargs)
+        profile.profiler = cProfile.Profile()
+        return profile.profiler.runcall(endpoint, *args, **kwargs)
+
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    def __init__(self, path: str, endpoint, **kwargs):
+        super().__init__(path, _profiled(endpoint), **kwargs)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("profile_query_start", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current.get()
+    if profile is None:
+        return
+    start = conn.info["profile_query_start"].pop()
+    profile.statements.append({
+        "sql": statement,
+        "duration_ms": round((time.perf_counter() - start) * 1000, 3),
+    })
+
+
+def _should_profile(request: Request) -> bool:
+    if TOKEN and secrets.compare_digest(request.headers.get(HEADER, ""), TOKEN):
+        return True
+    return SAMPLE_RATE > 0 and random.random() < SAMPLE_RATE
+
+
+def install(app: FastAPI):
+    # Precisa rodar antes da declaração das rotas para que usem ProfiledRoute
+    app.router.route_class = ProfiledRoute
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+    @app.middleware("http")
+    async def profile_request(request: Request, call_next):
+        if request.url.path.startswith("/debug/") or not _should_profile(request):
+            return await call_next(request)
+
+        profile = RequestProfile()
+        token = _current.set(profile)
+        start = time.perf_counter()
+        try:
+            response = await call_next(request)
+        finally:
+            _current.reset(token)
+        meta = {
+            "method": request.method,
+            "path": request.url.path,
+            "status_code": response.status_code,
+            "duration_ms": round((time.perf_counter() - start) * 1000, 3),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        }
+        await run_in_threadpool(store.save, profile, meta)
+        return response
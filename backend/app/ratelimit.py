@@ -0,0 +1,174 @@
+import math
+import os
+import threading
+import time
+from typing import Optional
+
+from fastapi import Depends, HTTPException, Request
+from sqlalchemy.orm import Session
+
+from . import auth, database, schemas
+
+# Orçamentos por usuário: (requisições por segundo, rajada máxima)
+READ_RATE = float(os.getenv("RATE_LIMIT_READ_PER_SEC", "20"))
+READ_BURST = float(os.getenv("RATE_LIMIT_READ_BURST", "40"))
+WRITE_RATE = float(os.getenv("RATE_LIMIT_WRITE_PER_SEC", "5"))
+WRITE_BURST = float(os.getenv("RATE_LIMIT_WRITE_BURST", "10"))
+# Login: um balde por conta (tenant, email) e um mais folgado por IP. Todo
+# login chega do processo do Streamlit, então o IP sozinho seria um limite
+# único para o app inteiro.
+LOGIN_RATE = float(os.getenv("RATE_LIMIT_LOGIN_PER_SEC", "0.5"))
+LOGIN_BURST = float(os.getenv("RATE_LIMIT_LOGIN_BURST", "5"))
+LOGIN_IP_RATE = float(os.getenv("RATE_LIMIT_LOGIN_IP_PER_SEC", "5"))
+LOGIN_IP_BURST = float(os.getenv("RATE_LIMIT_LOGIN_IP_BURST", "50"))
+# Limite de escritas simultâneas por tenant (cada tenant tem seu próprio SQLite).
+# A vaga fica ocupada enquanto a escrita espera na fila de group commit, então
+# um lote nunca passa de MAX_CONCURRENT_WRITES; com WRITE_COALESCING=1 o padrão
+# acompanha WRITE_BATCH_SIZE.
+_DEFAULT_CONCURRENT_WRITES = max(8, database.WRITE_BATCH_SIZE) if database.WRITE_COALESCING else 8
+MAX_CONCURRENT_WRITES = int(os.getenv("MAX_CONCURRENT_WRITES", str(_DEFAULT_CONCURRENT_WRITES)))
+
+
+class TokenBucketLimiter:
+    def __init__(self, rate: float, burst: float, max_keys: int = 10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self.allowed = 0
+        self.rejected = 0
+
+    # Consome um token de `key`; devolve 0 se permitido ou os segundos até o próximo token
+    def acquire(self, key) -> float:
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if len(self._buckets) >= self.max_keys:
+                    self._prune(now)
+                tokens = self.burst
+            else:
+                tokens, last = bucket
+                tokens = min(self.burst, tokens + (now - last) * self.rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                self.allowed += 1
+                return 0.0
+            self._buckets[key] = (tokens, now)
+            self.rejected += 1
+            return (1 - tokens) / self.rate
+
+    def _prune(self, now: float):
+        # Baldes cheios são equivalentes a baldes inexistentes
+        full = self.burst / self.rate
+        self._buckets = {k: v for k, v in self._buckets.items() if now - v[1] < full}
+
+    def stats(self):
+        return {
+            "rate": self.rate,
+            "burst": self.burst,
+            "keys": len(self._buckets),
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+        }
+
+
+class ConcurrencyLimiter:
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._semaphore = threading.BoundedSemaphore(limit)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.peak = 0
+        self.shed = 0
+
+    def try_acquire(self) -> bool:
+        if not self._semaphore.acquire(blocking=False):
+            with self._lock:
+                self.shed += 1
+            return False
+        with self._lock:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        return True
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+        self._semaphore.release()
+
+    def stats(self):
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "peak": self.peak,
+            "shed": self.shed,
+        }
+
+
+read_limiter = TokenBucketLimiter(READ_RATE, READ_BURST)
+write_limiter = TokenBucketLimiter(WRITE_RATE, WRITE_BURST)
+login_limiter = TokenBucketLimiter(LOGIN_RATE, LOGIN_BURST)
+login_ip_limiter = TokenBucketLimiter(LOGIN_IP_RATE, LOGIN_IP_BURST)
+write_concurrency = {}
+_write_concurrency_lock = threading.Lock()
+
+def _write_slots(tenant) -> ConcurrencyLimiter:
+    limiter = write_concurrency.get(tenant)
+    if limiter is None:
+        with _write_concurrency_lock:
+            limiter = write_concurrency.setdefault(tenant, ConcurrencyLimiter(MAX_CONCURRENT_WRITES))
+    return limiter
+
+
+def _too_many_requests(retry_after: float):
+    raise HTTPException(
+        status_code=429,
+        detail="Muitas requisições. Tente novamente em instantes.",
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+    )
+
+# Dependências async rodam direto no event loop, sem o salto para o threadpool
+async def limit_reads(db: Session = Depends(database.get_db), current_user: schemas.UserResponse = Depends(auth.get_current_user)):
+    wait = read_limiter.acquire((db.info.get("tenant"), current_user.id))
+    if wait:
+        _too_many_requests(wait)
+    return current_user
+
+async def limit_writes(db: Session = Depends(database.get_db), current_user: schemas.UserResponse = Depends(auth.get_current_user)):
+    tenant = db.info.get("tenant")
+    wait = write_limiter.acquire((tenant, current_user.id))
+    if wait:
+        _too_many_requests(wait)
+    slots = _write_slots(tenant)
+    if not slots.try_acquire():
+        _too_many_requests(1)
+    try:
+        yield current_user
+    finally:
+        slots.release()
+
+async def limit_login(request: Request, db: Session = Depends(database.get_db)):
+    client: Optional[str] = request.client.host if request.client else None
+    wait = login_ip_limiter.acquire(client)
+    if wait:
+        _too_many_requests(wait)
+    # O corpo fica em cache no Request, então o endpoint ainda consegue lê-lo
+    try:
+        email = str((await request.json()).get("email", "")).strip().lower()
+    except Exception:
+        email = ""
+    wait = login_limiter.acquire((db.info.get("tenant"), email))
+    if wait:
+        _too_many_requests(wait)
+
+def stats():
+    return {
+        "read": read_limiter.stats(),
+        "write": write_limiter.stats(),
+        "login": login_limiter.stats(),
+        "login_ip": login_ip_limiter.stats(),
+        "max_concurrent_writes": MAX_CONCURRENT_WRITES,
+        "write_concurrency": {str(tenant): limiter.stats() for tenant, limiter in list(write_concurrency.items())},
+    }
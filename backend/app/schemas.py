@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional
+from pydantic import BaseModel, EmailStr, Field, field_validator
+from typing import List, Optional
 from datetime import datetime
 from .models import UserRole, LeadStatus
 
@@ -33,7 +33,8 @@ class LeadBase(BaseModel):
     observation: Optional[str] = None
 
 class LeadCreate(LeadBase):
-    vendedor_id: int
+    # Sem vendedor_id o lead vai para o vendedor com menos leads abertos
+    vendedor_id: Optional[int] = None
 
 class LeadUpdate(BaseModel):
     status: LeadStatus
@@ -46,6 +47,52 @@ class LeadResponse(LeadBase):
     vendedor_id: int
     created_at: datetime
     updated_at: Optional[datetime]
+    version: int
+    
+    class Config:
+        from_attributes = True
+
+class UserSummary(BaseModel):
+    id: int
+    name: str
     
     class Config:
         from_attributes = True
+
+class VendedorSuggestion(UserSummary):
+    open_leads: int
+
+class LeadExpandedResponse(LeadResponse):
+    indicador: Optional[UserSummary] = None
+    vendedor: Optional[UserSummary] = None
+
+class LeadPage(BaseModel):
+    items: List[LeadExpandedResponse]
+    total: int
+    page: int
+    page_size: int
+
+class UserPage(BaseModel):
+    items: List[UserResponse]
+    total: int
+    page: int
+    page_size: int
+
+class LeadBulkUpdate(BaseModel):
+    lead_ids: List[int] = Field(min_length=1, max_length=500)
+    status: Optional[LeadStatus] = None
+    vendedor_id: Optional[int] = None
+
+    # Os campos podem ser omitidos, mas não enviados como null
+    @field_validator("status", "vendedor_id")
+    @classmethod
+    def not_null(cls, value):
+        if value is None:
+            raise ValueError("não pode ser nulo")
+        return value
+
+class BulkUpdateResult(BaseModel):
+    updated: int
+
+class TenantMove(BaseModel):
+    new_name: str
@@ -0,0 +1,240 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from .directory import VendedorDirectory
+from .write_queue import WriteQueue
+
+DEFAULT_TENANT = "default"
+TENANT_ID = re.compile(r"^[a-z0-9][a-z0-9_-]{0,62}$")
+
+
+class TenantUnavailable(Exception):
+    # Tenant bloqueado temporariamente (ex.: sendo movido)
+    pass
+
+
+class Shard:
+    def __init__(self, tenant: str, engine, write_queue: Optional[WriteQueue] = None, vendedores: Optional[VendedorDirectory] = None):
+        self.tenant = tenant
+        self.engine = engine
+        self.write_queue = write_queue
+        self.vendedores = vendedores or VendedorDirectory()
+        # As sessões carregam o shard em Session.info; database.py e directory.py
+        # usam isso para achar a fila de escrita e o diretório do tenant.
+        self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, info={
+            "tenant": tenant,
+            "write_queue": write_queue,
+            "vendedores": self.vendedores,
+        })
+        self.last_used = time.monotonic()
+        self.in_use = 0
+
+    def close(self):
+        if self.write_queue is not None:
+            self.write_queue.stop()
+        self.engine.dispose()
+
+
+class TenantRouter:
+    def __init__(self, tenants_dir: str, migrate: Callable, default: Shard, max_open: int = 64, idle_seconds: float = 600, write_queue_factory: Optional[Callable] = None):
+        self.tenants_dir = tenants_dir
+        self.migrate = migrate
+        self.default = default
+        self.max_open = max_open
+        self.idle_seconds = idle_seconds
+        self.write_queue_factory = write_queue_factory
+        self._shards = OrderedDict()
+        self._lock = threading.Lock()
+        self._default_migrated = False
+        self._blocked = set()
+        self._generation = 0
+        # Bancos já migrados por este processo; reabrir um shard despejado
+        # não repete o migrate (create_all, inspeção e checagem de índices)
+        self._migrated = set()
+        self.opened = 0
+        self.evicted = 0
+
+    def database_path(self, tenant: str) -> str:
+        return os.path.join(self.tenants_dir, f"{tenant}.db")
+
+    def exists(self, tenant: str) -> bool:
+        return tenant == DEFAULT_TENANT or os.path.exists(self.database_path(tenant))
+
+    def open_shard(self, tenant: str) -> Shard:
+        path = self.database_path(tenant)
+        # mode=rw: nunca cria um banco vazio no lugar de um tenant que foi movido
+        engine = create_engine(
+            f"sqlite:///file:{path}?mode=rw&uri=true",
+            connect_args={"check_same_thread": False}
+        )
+        # Migrações são aplicadas só na primeira abertura de cada banco
+        if path not in self._migrated:
+            try:
+                self.migrate(engine)
+            except Exception:
+                engine.dispose()
+                raise
+            self._migrated.add(path)
+        write_queue = self.write_queue_factory(engine) if self.write_queue_factory else None
+        return Shard(tenant, engine, write_queue)
+
+    def get(self, tenant: str) -> Optional[Shard]:
+        if tenant == DEFAULT_TENANT:
+            if not self._default_migrated:
+                with self._lock:
+                    if not self._default_migrated:
+                        self.migrate(self.default.engine)
+                        self._default_migrated = True
+            return self.default
+
+        while True:
+            now = time.monotonic()
+            with self._lock:
+                if tenant in self._blocked:
+                    raise TenantUnavailable(tenant)
+                generation = self._generation
+                shard = self._shards.get(tenant)
+                if shard is not None:
+                    self._shards.move_to_end(tenant)
+                    shard.last_used = now
+                    shard.in_use += 1
+                    evicted = self._evict_locked(now)
+            if shard is not None:
+                for old in evicted:
+                    old.close()
+                return shard
+
+            if not self.exists(tenant):
+                return None
+            try:
+                opened = self.open_shard(tenant)
+            except OperationalError:
+                # O arquivo sumiu entre a verificação e a abertura (tenant movido)
+                return None
+
+            with self._lock:
+                # Um tenant foi bloqueado/movido enquanto migrávamos: o engine
+                # aberto pode apontar para um arquivo que não existe mais.
+                stale = self._generation != generation
+                if not stale:
+                    # Outra requisição pode ter aberto o mesmo shard enquanto migrávamos
+                    shard = self._shards.get(tenant)
+                    if shard is None:
+                        shard, opened = opened, None
+                        self._shards[tenant] = shard
+                        self.opened += 1
+                    self._shards.move_to_end(tenant)
+                    shard.last_used = now
+                    shard.in_use += 1
+                    evicted = self._evict_locked(now)
+            if stale:
+                opened.close()
+                continue
+            for old in evicted + ([opened] if opened else []):
+                old.close()
+            return shard
+
+    def release(self, shard: Shard):
+        now = time.monotonic()
+        with self._lock:
+            if shard is not self.default:
+                shard.in_use -= 1
+                shard.last_used = now
+            # A varredura roda a cada requisição, então shards ociosos são
+            # fechados mesmo sem que outro tenant precise ser aberto
+            evicted = self._evict_locked(now)
+        for old in evicted:
+            old.close()
+
+    def _evict_locked(self, now: float):
+        evicted = []
+        # O OrderedDict fica em ordem de uso: os candidatos estão no começo
+        for tenant, shard in list(self._shards.items()):
+            over_capacity = len(self._shards) > self.max_open
+            idle = now - shard.last_used > self.idle_seconds
+            if not (over_capacity or idle):
+                break
+            if shard.in_use:
+                continue
+            del self._shards[tenant]
+            evicted.append(shard)
+        self.evicted += len(evicted)
+        return evicted
+
+    @contextmanager
+    def blocked(self, tenant: str, timeout: float = 30):
+        # Recusa novas requisições ao tenant, espera as em andamento terminarem
+        # e fecha o shard, para que o arquivo possa ser copiado ou removido.
+        with self._lock:
+            if tenant in self._blocked:
+                raise TenantUnavailable(tenant)
+            self._blocked.add(tenant)
+            self._generation += 1
+        try:
+            deadline = time.monotonic() + timeout
+            while True:
+                with self._lock:
+                    shard = self._shards.get(tenant)
+                    if shard is None or not shard.in_use:
+                        self._shards.pop(tenant, None)
+                        break
+                if time.monotonic() > deadline:
+                    raise TenantUnavailable(tenant)
+                time.sleep(0.05)
+            if shard is not None:
+                shard.close()
+            yield
+        finally:
+            with self._lock:
+                self._blocked.discard(tenant)
+
+    def move(self, tenant: str, new_tenant: str, target_dir: Optional[str] = None) -> str:
+        source = self.database_path(tenant)
+        target = os.path.join(target_dir or self.tenants_dir, f"{new_tenant}.db")
+        with self.blocked(tenant), self.blocked(new_tenant):
+            if not os.path.exists(source):
+                raise FileNotFoundError(source)
+            if os.path.exists(target):
+                raise FileExistsError(target)
+            os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+            # A API de backup do SQLite copia uma versão consistente do banco
+            src = sqlite3.connect(source)
+            dst = sqlite3.connect(target)
+            try:
+                with dst:
+                    src.backup(dst)
+            finally:
+                dst.close()
+                src.close()
+            os.remove(source)
+            self._migrated.discard(source)
+        return target
+
+    def close_all(self):
+        with self._lock:
+            shards, self._shards = list(self._shards.values()), OrderedDict()
+        for shard in shards:
+            shard.close()
+        if self.default.write_queue is not None:
+            self.default.write_queue.stop()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "open": len(self._shards),
+                "max_open": self.max_open,
+                "opened": self.opened,
+                "evicted": self.evicted,
+                "tenants": list(self._shards),
+                "blocked": sorted(self._blocked),
+            }
@@ -0,0 +1,131 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable
+
+from sqlalchemy.orm import Session
+
+# Cada operação recebe a sessão do writer, aplica suas mudanças (sem commit)
+# e devolve um callable que é chamado depois do commit para produzir o
+# resultado entregue ao chamador (normalmente o id atribuído).
+WriteOp = Callable[[Session], Callable[[], object]]
+
+
+class WriteQueue:
+    def __init__(self, session_factory, max_batch: int = 64, max_delay: float = 0.0):
+        self.session_factory = session_factory
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.ops = 0
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="write-queue", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+
+    def submit(self, op: WriteOp) -> Future:
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            self.start()
+        future = Future()
+        self._queue.put((op, future))
+        return future
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.max_delay
+            stopping = False
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            try:
+                self._commit_batch(batch)
+            except Exception as e:
+                # Qualquer falha fora das operações (abrir a sessão, rollback)
+                # é entregue aos chamadores; ninguém fica esperando para sempre
+                # e o writer continua vivo para os próximos lotes.
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            if stopping:
+                return
+
+    def _commit_batch(self, batch):
+        batch = [(op, future) for op, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        db = self.session_factory()
+        try:
+            finishers = []
+            for op, future in batch:
+                # Cada operação roda em um SAVEPOINT: uma falha esperada
+                # (conflito de versão, Idempotency-Key repetida) desfaz só
+                # ela e as demais seguem no mesmo commit.
+                try:
+                    with db.begin_nested():
+                        finishers.append(op(db))
+                except Exception as e:
+                    future.set_exception(e)
+                    finishers.append(None)
+            db.commit()
+        except Exception:
+            try:
+                db.rollback()
+            finally:
+                db.close()
+            # Se o commit do lote falhar, refaz cada operação ainda pendente
+            # na sua própria transação.
+            for op, future in batch:
+                if not future.done():
+                    self._commit_one(op, future)
+            return
+        try:
+            for (_, future), finish in zip(batch, finishers):
+                if finish is None:
+                    continue
+                try:
+                    future.set_result(finish())
+                except Exception as e:
+                    future.set_exception(e)
+        finally:
+            db.close()
+        self.batches += 1
+        self.ops += len(batch)
+
+    def _commit_one(self, op, future):
+        db = self.session_factory()
+        try:
+            finish = op(db)
+            db.commit()
+            future.set_result(finish())
+            self.batches += 1
+            self.ops += 1
+        except Exception as e:
+            future.set_exception(e)
+            db.rollback()
+        finally:
+            db.close()
@@ -0,0 +1,111 @@
+import sys
+import os
+sys.path.insert(0, os.path.dirname(__file__))
+
+import argparse
+import multiprocessing
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import database, models, schemas, tenancy
+
+def create_tenants(tenants_dir: str, n_tenants: int):
+    ids = {}
+    for i in range(n_tenants):
+        tenant = f"bench-{i}"
+        engine = create_engine(f"sqlite:///{os.path.join(tenants_dir, tenant)}.db")
+        database.migrate(engine)
+        db = sessionmaker(bind=engine)()
+        indicador = models.User(name="Indicador", email="indicador@bench.me", password="x", role=models.UserRole.INDICADOR)
+        vendedor = models.User(name="Vendedor", email="vendedor@bench.me", password="x", role=models.UserRole.VENDEDOR)
+        db.add_all([indicador, vendedor])
+        db.commit()
+        ids[tenant] = (indicador.id, vendedor.id)
+        db.close()
+        engine.dispose()
+    return ids
+
+def writer_group(tenants_dir: str, tenant: str, ids, threads: int, leads_per_writer: int, barrier):
+    # Cada processo é um grupo de escritores com seu próprio shard, como um
+    # worker da API: sem GIL compartilhado, só o lock de escrita do SQLite
+    # limita escritores do mesmo tenant.
+    indicador_id, vendedor_id = ids
+    engine = create_engine(
+        f"sqlite:///{os.path.join(tenants_dir, tenant)}.db",
+        connect_args={"check_same_thread": False, "timeout": 60}
+    )
+    write_queue = database._new_write_queue(engine) if database.WRITE_COALESCING else None
+    shard = tenancy.Shard(tenant, engine, write_queue)
+    lead = schemas.LeadCreate(
+        client_name="Cliente Benchmark",
+        phone="(11) 91234-5678",
+        city_state="São Paulo/SP",
+        vendedor_id=vendedor_id
+    )
+
+    def writer():
+        db = shard.SessionLocal()
+        try:
+            for _ in range(leads_per_writer):
+                database.create_lead(db, lead, indicador_id)
+        finally:
+            db.close()
+
+    workers = [threading.Thread(target=writer) for _ in range(threads)]
+    barrier.wait()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    shard.close()
+
+def run(n_tenants: int, processes: int, threads: int, leads_per_writer: int):
+    ctx = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as tmp:
+        ids = create_tenants(tmp, n_tenants)
+        tenants = list(ids)
+        # O número de processos é fixo; só muda quantos tenants os dividem
+        barrier = ctx.Barrier(processes + 1)
+        group = [
+            ctx.Process(target=writer_group, args=(tmp, tenants[i % n_tenants], ids[tenants[i % n_tenants]], threads, leads_per_writer, barrier))
+            for i in range(processes)
+        ]
+        for p in group:
+            p.start()
+        # Espera todos os processos subirem antes de começar a medir
+        barrier.wait()
+        inicio = time.perf_counter()
+        for p in group:
+            p.join()
+        duracao = time.perf_counter() - inicio
+        if any(p.exitcode for p in group):
+            raise RuntimeError("um dos processos escritores falhou")
+
+    return processes * threads * leads_per_writer / duracao
+
+def main():
+    parser = argparse.ArgumentParser(description="Vazão de escrita de leads por número de tenants")
+    parser.add_argument("--processes", type=int, default=8, help="processos escritores (um shard cada)")
+    parser.add_argument("--threads", type=int, default=2, help="escritores por processo")
+    parser.add_argument("--leads", type=int, default=50, help="leads por escritor")
+    args = parser.parse_args()
+
+    print(f"{args.processes} processos x {args.threads} escritores, {args.leads} leads cada "
+          f"(WRITE_COALESCING={int(database.WRITE_COALESCING)}, {os.cpu_count()} CPUs)")
+    if (os.cpu_count() or 1) < args.processes:
+        print("Aviso: menos CPUs que processos; a vazão fica limitada pela CPU e o ganho por tenant não aparece")
+    print(f"{'tenants':>8} {'leads/s':>10} {'ganho':>8}")
+    base = None
+    for n_tenants in (1, 2, 4, 8):
+        if n_tenants > args.processes:
+            break
+        throughput = run(n_tenants, args.processes, args.threads, args.leads)
+        base = base or throughput
+        print(f"{n_tenants:>8} {throughput:>10.0f} {throughput / base:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import sys
+import os
+sys.path.insert(0, os.path.dirname(__file__))
+
+import argparse
+import statistics
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import database, models, schemas
+
+def setup_database(path):
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    models.Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    db = Session()
+    indicador = models.User(name="Indicador", email="indicador@bench.me", password="x", role=models.UserRole.INDICADOR)
+    vendedor = models.User(name="Vendedor", email="vendedor@bench.me", password="x", role=models.UserRole.VENDEDOR)
+    db.add_all([indicador, vendedor])
+    db.commit()
+    ids = (indicador.id, vendedor.id)
+    db.close()
+    return engine, Session, ids
+
+def run(writers, leads_per_writer, coalescing):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine, Session, (indicador_id, vendedor_id) = setup_database(os.path.join(tmp, "bench.db"))
+        # Mesma fila que a API usa, com WRITE_BATCH_SIZE / WRITE_BATCH_DELAY_MS
+        database.write_queue = database._new_write_queue(engine) if coalescing else None
+
+        latencias = []
+        lock = threading.Lock()
+        lead = schemas.LeadCreate(
+            client_name="Cliente Benchmark",
+            phone="(11) 91234-5678",
+            city_state="São Paulo/SP",
+            vendedor_id=vendedor_id
+        )
+
+        def writer():
+            db = Session()
+            local = []
+            try:
+                for _ in range(leads_per_writer):
+                    inicio = time.perf_counter()
+                    database.create_lead(db, lead, indicador_id)
+                    local.append(time.perf_counter() - inicio)
+            finally:
+                db.close()
+            with lock:
+                latencias.extend(local)
+
+        threads = [threading.Thread(target=writer) for _ in range(writers)]
+        inicio = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        duracao = time.perf_counter() - inicio
+
+        if database.write_queue is not None:
+            database.write_queue.stop()
+            database.write_queue = None
+        engine.dispose()
+
+    latencias.sort()
+    return {
+        "throughput": len(latencias) / duracao,
+        "p50": statistics.median(latencias) * 1000,
+        "p99": latencias[int(len(latencias) * 0.99) - 1] * 1000,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de inserção de leads com e sem group commit")
+    parser.add_argument("--total", type=int, default=1000, help="leads inseridos por cenário")
+    args = parser.parse_args()
+
+    print(f"WRITE_BATCH_SIZE={database.WRITE_BATCH_SIZE} WRITE_BATCH_DELAY_MS={database.WRITE_BATCH_DELAY_MS:g}")
+    print(f"{'writers':>8} {'modo':>10} {'leads/s':>10} {'p50 (ms)':>10} {'p99 (ms)':>10}")
+    for writers in (1, 10, 100):
+        for coalescing in (False, True):
+            r = run(writers, max(1, args.total // writers), coalescing)
+            modo = "coalesced" if coalescing else "direto"
+            print(f"{writers:>8} {modo:>10} {r['throughput']:>10.0f} {r['p50']:>10.2f} {r['p99']:>10.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+import sys
+import os
+sys.path.insert(0, os.path.dirname(__file__))
+
+from contextlib import contextmanager
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import auth, database, directory, models
+from app.main import app
+
+# Rotas de listagem e quantas consultas cada uma pode emitir, independente
+# do número de leads retornados (inclui a consulta de autenticação). O
+# diretório de vendedores já está carregado, então /vendedores/ só autentica.
+LIST_ENDPOINTS = {
+    "/leads/": 2,
+    "/leads/?expand=vendedor,indicador": 2,
+    "/leads/search": 3,
+    "/leads/search?expand=vendedor,indicador": 3,
+    "/leads/counts": 2,
+    "/users/": 2,
+    "/users/search": 3,
+    "/vendedores/": 1,
+    "/vendedores/sugerido": 1,
+}
+
+USERS = {
+    "admin@indicavende.me": "gestor",
+    "juliano@indicavende.me": "vendedor",
+    "pedro@indicavende.me": "indicador",
+}
+
+# Listagens restritas ao gestor; os demais perfis devem receber 403
+GESTOR_ONLY = {"/users/", "/users/search"}
+
+def expected_status(role: str, endpoint: str) -> int:
+    if endpoint in GESTOR_ONLY and role != "gestor":
+        return 403
+    return 200
+
+
+class QueryCounter:
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+    @contextmanager
+    def track(self):
+        self.count = 0
+        event.listen(self.engine, "before_cursor_execute", self._on_execute)
+        try:
+            yield self
+        finally:
+            event.remove(self.engine, "before_cursor_execute", self._on_execute)
+
+
+def build_client(n_leads: int):
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    database.migrate(engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    db = Session()
+    auth.seed_database(db)
+    vendedores = database.get_vendedores(db)
+    indicador = database.get_user_by_email(db, "pedro@indicavende.me")
+    for i in range(n_leads):
+        db.add(models.Lead(
+            client_name=f"Cliente {i}",
+            phone="(11) 91234-5678",
+            city_state="São Paulo/SP",
+            indicador_id=indicador.id,
+            vendedor_id=vendedores[i % len(vendedores)].id
+        ))
+    db.commit()
+    directory.vendedores = directory.VendedorDirectory()
+    directory.vendedores.search(db)
+    db.close()
+
+    def get_test_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[database.get_db] = get_test_db
+    return TestClient(app), QueryCounter(engine)
+
+def measure(n_leads: int):
+    client, counter = build_client(n_leads)
+    counts = {}
+    for email in USERS:
+        for endpoint in LIST_ENDPOINTS:
+            with counter.track():
+                response = client.get(endpoint, headers={"X-User-Email": email})
+            counts[(email, endpoint)] = (response.status_code, counter.count)
+    app.dependency_overrides.clear()
+    return counts
+
+def main():
+    small = measure(5)
+    large = measure(60)
+
+    failures = []
+    for (email, endpoint), (status_code, count) in sorted(large.items()):
+        small_status, small_count = small[(email, endpoint)]
+        expected = expected_status(USERS[email], endpoint)
+        limit = LIST_ENDPOINTS[endpoint]
+        status = "ok"
+        if status_code != expected or small_status != expected:
+            status = "FALHOU"
+            failures.append((email, endpoint))
+        elif count != small_count or count > limit:
+            status = "FALHOU"
+            failures.append((email, endpoint))
+        print(f"{status:>6}  HTTP {small_status}/{status_code} (esperado {expected})  {small_count} -> {count} consultas (máx {limit})  {endpoint}  [{email}]")
+
+    if failures:
+        print(f"\n{len(failures)} listagem(ns) com status inesperado ou número de consultas crescente/acima do limite")
+        sys.exit(1)
+    print("\nTodas as listagens emitem um número constante de consultas")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+import sys
+import os
+sys.path.insert(0, os.path.dirname(__file__))
+
+import argparse
+import json
+import urllib.error
+import urllib.request
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import auth, database, tenancy
+
+def tenant_path(tenants_dir: str, tenant: str):
+    if not tenancy.TENANT_ID.match(tenant) or tenant == tenancy.DEFAULT_TENANT:
+        print(f"Erro: tenant inválido: {tenant}")
+        sys.exit(1)
+    return os.path.join(tenants_dir, f"{tenant}.db")
+
+def create_tenant(args):
+    path = tenant_path(args.tenants_dir, args.tenant)
+    if os.path.exists(path):
+        print(f"Erro: tenant {args.tenant} já existe ({path})")
+        sys.exit(1)
+    os.makedirs(args.tenants_dir, exist_ok=True)
+
+    engine = create_engine(f"sqlite:///{path}")
+    database.migrate(engine)
+    if args.seed:
+        db = sessionmaker(bind=engine)()
+        auth.seed_database(db)
+        db.close()
+    engine.dispose()
+    print(f"✅ Tenant {args.tenant} criado em {path}")
+
+def list_tenants(args):
+    if not os.path.isdir(args.tenants_dir):
+        print("Nenhum tenant cadastrado")
+        return
+    for name in sorted(os.listdir(args.tenants_dir)):
+        if name.endswith(".db"):
+            size = os.path.getsize(os.path.join(args.tenants_dir, name)) / 1024
+            print(f"{name[:-3]:<30} {size:>10.0f} KB")
+
+def move_tenant(args):
+    new_name = args.new_name or args.tenant
+    tenant_path(args.tenants_dir, args.tenant)
+    tenant_path(args.tenants_dir, new_name)
+    if args.to_dir and not args.offline:
+        print("Erro: --to-dir só pode ser usado com --offline")
+        sys.exit(1)
+
+    if args.offline:
+        # Sem a API no ar não há shards abertos; o roteador local faz a cópia
+        router = tenancy.TenantRouter(args.tenants_dir, database.migrate, default=database.router.default)
+        try:
+            target = router.move(args.tenant, new_name, args.to_dir)
+        except FileNotFoundError:
+            print(f"Erro: tenant {args.tenant} não encontrado")
+            sys.exit(1)
+        except FileExistsError as e:
+            print(f"Erro: destino {e} já existe")
+            sys.exit(1)
+        print(f"✅ Tenant movido para {target}")
+        return
+
+    # Com a API no ar, a mudança passa pelo roteador dela: o tenant fica
+    # bloqueado e o shard é fechado antes da cópia.
+    request = urllib.request.Request(
+        f"{args.api_url}/debug/tenants/{args.tenant}/move",
+        data=json.dumps({"new_name": new_name}).encode(),
+        headers={"Content-Type": "application/json", "X-User-Email": args.email},
+        method="POST"
+    )
+    try:
+        with urllib.request.urlopen(request) as response:
+            result = json.load(response)
+    except urllib.error.HTTPError as e:
+        print(f"Erro: {e.code} {e.read().decode()}")
+        sys.exit(1)
+    except urllib.error.URLError as e:
+        print(f"Erro: API indisponível em {args.api_url} ({e.reason}); use --offline se ela estiver parada")
+        sys.exit(1)
+    print(f"✅ Tenant movido para {result['path']}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Administração de tenants do IndicaVende")
+    parser.add_argument("--tenants-dir", default=database.TENANTS_DIR)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    create = sub.add_parser("create", help="cria o banco de um novo tenant")
+    create.add_argument("tenant")
+    create.add_argument("--seed", action="store_true", help="cadastra os usuários de teste")
+    create.set_defaults(func=create_tenant)
+
+    listing = sub.add_parser("list", help="lista os tenants existentes")
+    listing.set_defaults(func=list_tenants)
+
+    move = sub.add_parser("move", help="renomeia um tenant ou move para outro diretório")
+    move.add_argument("tenant")
+    move.add_argument("--new-name")
+    move.add_argument("--api-url", default=os.getenv("BACKEND_URL", "http://localhost:8000"))
+    move.add_argument("--email", default=os.getenv("GESTOR_EMAIL", "admin@indicavende.me"), help="gestor do tenant padrão")
+    move.add_argument("--offline", action="store_true", help="move direto no disco; só com a API parada")
+    move.add_argument("--to-dir", help="diretório de destino (apenas com --offline)")
+    move.set_defaults(func=move_tenant)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
@@ -2,9 +2,6 @@ import streamlit as st
 import requests
 import json
 from auth import login, logout, get_current_user, register
-from indicador import show_indicador_interface
-from vendedor import show_vendedor_interface
-from gestor import show_gestor_interface
 
 st.set_page_config(
     page_title="IndicaVende",
@@ -130,11 +127,15 @@ def show_main_interface():
     
     st.markdown("---")
     
+    # Cada perfil importa só a própria página; o gestor traz pandas/scipy/matplotlib
     if user['role'] == 'indicador':
+        from indicador import show_indicador_interface
         show_indicador_interface()
     elif user['role'] == 'vendedor':
+        from vendedor import show_vendedor_interface
         show_vendedor_interface()
     elif user['role'] == 'gestor':
+        from gestor import show_gestor_interface
         show_gestor_interface()
 
 if __name__ == "__main__":
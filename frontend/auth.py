@@ -1,15 +1,21 @@
 import requests
 import streamlit as st
 import os
+import time
 
 BASE_URL = os.getenv("BACKEND_URL", "http://localhost:8000")
+REQUEST_TIMEOUT = float(os.getenv("REQUEST_TIMEOUT", "10"))
+TENANT_ID = os.getenv("TENANT_ID")
+
+def tenant_headers():
+    return {"X-Tenant": TENANT_ID} if TENANT_ID else {}
 
 def login(email: str, password: str):
     try:
         response = requests.post(f"{BASE_URL}/auth/login", json={
             "email": email,
             "password": password
-        })
+        }, headers=tenant_headers())
         
         if response.status_code == 200:
             return response.json()
@@ -25,7 +31,7 @@ def register(name: str, email: str, password: str, role: str):
             "email": email,
             "password": password,
             "role": role
-        })
+        }, headers=tenant_headers())
         
         if response.status_code == 200:
             return response.json()
@@ -45,23 +51,37 @@ def logout():
 def get_current_user():
     return st.session_state.get('user')
 
-def make_authenticated_request(endpoint: str, method: str = "GET", data: dict = None):
+def make_authenticated_request(endpoint: str, method: str = "GET", data: dict = None, headers: dict = None, retries: int = 0):
     user = get_current_user()
     if not user:
         return None
     
-    headers = {"X-User-Email": user.get('email')}
+    headers = {"X-User-Email": user.get('email'), **tenant_headers(), **(headers or {})}
     url = f"{BASE_URL}{endpoint}"
+    # Só requisições idempotentes (GET, PUT com If-Match, POST com
+    # Idempotency-Key) devem usar retries > 0
+    timeout = REQUEST_TIMEOUT if retries else None
     
-    try:
-        if method == "GET":
-            response = requests.get(url, headers=headers)
-        elif method == "POST":
-            response = requests.post(url, json=data, headers=headers)
-        elif method == "PUT":
-            response = requests.put(url, json=data, headers=headers)
+    for attempt in range(retries + 1):
+        try:
+            if method == "GET":
+                response = requests.get(url, headers=headers, timeout=timeout)
+            elif method == "POST":
+                response = requests.post(url, json=data, headers=headers, timeout=timeout)
+            elif method == "PUT":
+                response = requests.put(url, json=data, headers=headers, timeout=timeout)
+        except Exception as e:
+            if attempt < retries:
+                time.sleep(0.5 * 2 ** attempt)
+                continue
+            st.error(f"Erro ao conectar com o servidor: {e}")
+            return None
         
-        return response
-    except Exception as e:
-        st.error(f"Erro ao conectar com o servidor: {e}")
-        return None
+        if response.status_code >= 500 and attempt < retries:
+            time.sleep(0.5 * 2 ** attempt)
+            continue
+        break
+    
+    if response.status_code == 429:
+        st.warning(f"Muitas requisições. Aguarde {response.headers.get('Retry-After', '1')}s e tente novamente.")
+    return response
@@ -0,0 +1,67 @@
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+USERS = {
+    "indicador": {"id": 3, "name": "Pedro", "email": "pedro@indicavende.me", "role": "indicador"},
+    "vendedor": {"id": 2, "name": "Juliano", "email": "juliano@indicavende.me", "role": "vendedor"},
+    "gestor": {"id": 1, "name": "Admin", "email": "admin@indicavende.me", "role": "gestor"},
+}
+
+HEAVY_MODULES = ["pandas", "numpy", "scipy.stats", "matplotlib.pyplot"]
+
+def render_first_page(role: str):
+    # Roda em um processo novo: mede a primeira renderização com imports frios
+    inicio = time.perf_counter()
+    sys.path.insert(0, APP_DIR)
+    from streamlit.testing.v1 import AppTest
+
+    streamlit_pronto = time.perf_counter()
+    at = AppTest.from_file(os.path.join(APP_DIR, "app.py"), default_timeout=60)
+    at.session_state.user = USERS[role]
+    at.run()
+    fim = time.perf_counter()
+
+    print(json.dumps({
+        "total_ms": (fim - inicio) * 1000,
+        "render_ms": (fim - streamlit_pronto) * 1000,
+        "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "heavy": [m for m in HEAVY_MODULES if m in sys.modules],
+        "errors": [str(e.value) for e in at.exception],
+    }))
+
+def main():
+    parser = argparse.ArgumentParser(description="Tempo de cold start e RSS da primeira página de cada perfil")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--child", choices=list(USERS), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        render_first_page(args.child)
+        return
+
+    print(f"Backend: {os.getenv('BACKEND_URL', 'http://localhost:8000')}")
+    print(f"{'perfil':>10} {'total (ms)':>11} {'render (ms)':>12} {'RSS (MB)':>9}  módulos pesados")
+    for role in USERS:
+        resultados = []
+        for _ in range(args.runs):
+            saida = subprocess.run(
+                [sys.executable, __file__, "--child", role],
+                capture_output=True, text=True, check=True
+            ).stdout
+            resultados.append(json.loads(saida.strip().splitlines()[-1]))
+
+        melhor = min(resultados, key=lambda r: r["total_ms"])
+        if melhor["errors"]:
+            print(f"{role:>10} erro: {melhor['errors'][0]}")
+            continue
+        print(f"{role:>10} {melhor['total_ms']:>11.0f} {melhor['render_ms']:>12.0f} {melhor['rss_mb']:>9.1f}  {', '.join(melhor['heavy']) or '-'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+import streamlit as st
+
+STATUS_LABELS = {
+    "novo": "Novo",
+    "em_contato": "Em Contato",
+    "em_negociacao": "Em Negociação",
+    "fechado": "Fechado",
+    "perdido": "Perdido"
+}
+
+def show_pagination(state_key: str, total: int, page_size: int):
+    total_pages = max(1, -(-total // page_size))
+    page = min(st.session_state[state_key], total_pages)
+    st.session_state[state_key] = page
+    
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        if st.button("⬅️ Anterior", key=f"{state_key}_prev", disabled=page <= 1):
+            st.session_state[state_key] = page - 1
+            st.rerun()
+    with col2:
+        st.write(f"Página {page} de {total_pages} — {total} registro(s)")
+    with col3:
+        if st.button("Próxima ➡️", key=f"{state_key}_next", disabled=page >= total_pages):
+            st.session_state[state_key] = page + 1
+            st.rerun()
@@ -1,10 +1,21 @@
 import streamlit as st
 from auth import get_current_user, make_authenticated_request
+from components import STATUS_LABELS, show_pagination
 import pandas as pd
 from datetime import datetime
-import numpy as np 
-import scipy.stats as stats
-import matplotlib.pyplot as plt
+from urllib.parse import urlencode
+
+SORT_LABELS = {
+    "created_at": "Data de criação",
+    "updated_at": "Última atualização",
+    "client_name": "Cliente",
+    "status": "Status",
+    "id": "ID"
+}
+
+PAGE_SIZES = [25, 50, 100, 200]
+USER_SEARCH_LIMIT = 50
+
 def show_gestor_interface():
     menu = st.sidebar.selectbox("Menu Gestor", ["Dashboard", "Leads", "Usuários"])
     
@@ -16,6 +27,11 @@ def show_gestor_interface():
         show_gestor_usuarios()
 
 def show_gestor_dashboard():
+    # Bibliotecas pesadas só são carregadas quando o dashboard é aberto
+    import numpy as np
+    import scipy.stats as stats
+    import matplotlib.pyplot as plt
+
     st.header("📊 Dashboard Executivo")
 
     response = make_authenticated_request("/leads/")
@@ -119,4 +135,208 @@ def show_gestor_dashboard():
 
         st.markdown("---")
     else:
-        st.error("❌ Erro ao carregar dados do dashboard")
\ No newline at end of file
+        st.error("❌ Erro ao carregar dados do dashboard")
+
+@st.cache_data(ttl=60, show_spinner=False)
+def search_users_by_role(role: str, q: str, user_email: str):
+    # user_email entra na chave do cache para não misturar sessões. Só as
+    # primeiras USER_SEARCH_LIMIT correspondências vão para os selectboxes.
+    if role == "vendedor":
+        # Busca por prefixo do nome no diretório de vendedores em memória
+        params = urlencode({"q": q, "limit": USER_SEARCH_LIMIT} if q else {"limit": USER_SEARCH_LIMIT})
+        response = make_authenticated_request(f"/vendedores/?{params}")
+        items = response.json() if response and response.status_code == 200 else []
+    else:
+        params = urlencode({"role": role, "q": q, "page_size": USER_SEARCH_LIMIT})
+        response = make_authenticated_request(f"/users/search?{params}")
+        items = response.json()['items'] if response and response.status_code == 200 else []
+    return {u['id']: u['name'] for u in items}
+
+def show_user_search(label: str, role: str, user_email: str):
+    q = st.text_input(f"Buscar {label}", key=f"busca_{role}")
+    users = search_users_by_role(role, q.strip(), user_email)
+    if len(users) >= USER_SEARCH_LIMIT:
+        st.caption(f"Mostrando os primeiros {USER_SEARCH_LIMIT}; refine a busca.")
+    return users
+
+def show_gestor_leads():
+    st.header("📋 Leads")
+    
+    user = get_current_user()
+    # As buscas ficam fora dos formulários para atualizar as opções ao digitar
+    col1, col2 = st.columns(2)
+    with col1:
+        vendedores = show_user_search("vendedor", "vendedor", user['email'])
+    with col2:
+        indicadores = show_user_search("indicador", "indicador", user['email'])
+    
+    if 'leads_page' not in st.session_state:
+        st.session_state.leads_page = 1
+        st.session_state.leads_filters = {}
+    
+    with st.form("filtros_leads"):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            q = st.text_input("Buscar (cliente, telefone, cidade)")
+            status = st.selectbox(
+                "Status",
+                options=[""] + list(STATUS_LABELS),
+                format_func=lambda x: STATUS_LABELS.get(x, "Todos")
+            )
+        with col2:
+            vendedor_id = st.selectbox(
+                "Vendedor",
+                options=[None] + list(vendedores),
+                format_func=lambda x: vendedores.get(x, "Todos")
+            )
+            indicador_id = st.selectbox(
+                "Indicador",
+                options=[None] + list(indicadores),
+                format_func=lambda x: indicadores.get(x, "Todos")
+            )
+        with col3:
+            date_from = st.date_input("De", value=None)
+            date_to = st.date_input("Até", value=None)
+        
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            sort = st.selectbox("Ordenar por", options=list(SORT_LABELS), format_func=lambda x: SORT_LABELS[x])
+        with col2:
+            order = st.radio("Ordem", options=["desc", "asc"], format_func=lambda x: "Decrescente" if x == "desc" else "Crescente", horizontal=True)
+        with col3:
+            page_size = st.selectbox("Itens por página", options=PAGE_SIZES, index=1)
+        
+        if st.form_submit_button("Filtrar"):
+            st.session_state.leads_filters = {
+                "q": q,
+                "status": status,
+                "vendedor_id": vendedor_id,
+                "indicador_id": indicador_id,
+                "date_from": date_from.isoformat() if date_from else None,
+                "date_to": date_to.isoformat() if date_to else None,
+                "sort": sort,
+                "order": order,
+                "page_size": page_size
+            }
+            st.session_state.leads_page = 1
+    
+    filters = {k: v for k, v in st.session_state.leads_filters.items() if v}
+    page_size = filters.get("page_size", 50)
+    params = urlencode(dict(filters, page=st.session_state.leads_page, page_size=page_size, expand="vendedor,indicador"))
+    
+    response = make_authenticated_request(f"/leads/search?{params}")
+    if not response or response.status_code != 200:
+        st.error("❌ Erro ao carregar leads")
+        return
+    
+    data = response.json()
+    if not data['items']:
+        st.info("📭 Nenhum lead encontrado com esses filtros.")
+        return
+    
+    df = pd.DataFrame([{
+        "Selecionar": False,
+        "ID": lead['id'],
+        "Cliente": lead['client_name'],
+        "Telefone": lead['phone'],
+        "Cidade/Estado": lead['city_state'],
+        "Status": STATUS_LABELS.get(lead['status'], lead['status']),
+        "Vendedor": lead['vendedor']['name'],
+        "Indicador": lead['indicador']['name'],
+        "Data": lead['created_at'][:10]
+    } for lead in data['items']])
+    
+    edited = st.data_editor(
+        df,
+        hide_index=True,
+        use_container_width=True,
+        disabled=[c for c in df.columns if c != "Selecionar"],
+        key=f"leads_grid_{st.session_state.leads_page}"
+    )
+    show_pagination("leads_page", data['total'], page_size)
+    
+    selecionados = edited.loc[edited["Selecionar"], "ID"].tolist()
+    
+    st.markdown("---")
+    st.subheader("✏️ Ações em lote")
+    with st.form("acoes_lote"):
+        col1, col2 = st.columns(2)
+        with col1:
+            novo_status = st.selectbox(
+                "Novo status",
+                options=[""] + list(STATUS_LABELS),
+                format_func=lambda x: STATUS_LABELS.get(x, "Manter")
+            )
+        with col2:
+            novo_vendedor = st.selectbox(
+                "Reatribuir para",
+                options=[None] + list(vendedores),
+                format_func=lambda x: vendedores.get(x, "Manter")
+            )
+        
+        if st.form_submit_button(f"Aplicar a {len(selecionados)} lead(s) selecionado(s)"):
+            update_data = {"lead_ids": selecionados}
+            if novo_status:
+                update_data["status"] = novo_status
+            if novo_vendedor:
+                update_data["vendedor_id"] = novo_vendedor
+            
+            if not selecionados:
+                st.warning("Selecione ao menos um lead.")
+            elif len(update_data) == 1:
+                st.warning("Escolha um novo status ou vendedor.")
+            else:
+                response = make_authenticated_request("/leads/bulk", "PUT", update_data)
+                if response and response.status_code == 200:
+                    st.success(f"{response.json()['updated']} lead(s) atualizado(s)!")
+                    st.rerun()
+                else:
+                    st.error("Erro ao atualizar leads")
+
+def show_gestor_usuarios():
+    st.header("👥 Usuários")
+    
+    if 'users_page' not in st.session_state:
+        st.session_state.users_page = 1
+    
+    col1, col2 = st.columns([2, 1])
+    with col1:
+        q = st.text_input("Buscar por nome ou email")
+    with col2:
+        role = st.selectbox(
+            "Perfil",
+            options=["", "gestor", "vendedor", "indicador"],
+            format_func=lambda x: x.title() if x else "Todos"
+        )
+    
+    # Volta para a primeira página quando o filtro muda
+    if st.session_state.get('users_filters') != (q, role):
+        st.session_state.users_filters = (q, role)
+        st.session_state.users_page = 1
+    
+    page_size = 50
+    params = {"page": st.session_state.users_page, "page_size": page_size}
+    if q:
+        params["q"] = q
+    if role:
+        params["role"] = role
+    
+    response = make_authenticated_request(f"/users/search?{urlencode(params)}")
+    if not response or response.status_code != 200:
+        st.error("❌ Erro ao carregar usuários")
+        return
+    
+    data = response.json()
+    if not data['items']:
+        st.info("Nenhum usuário encontrado.")
+        return
+    
+    df = pd.DataFrame([{
+        "ID": u['id'],
+        "Nome": u['name'],
+        "Email": u['email'],
+        "Perfil": u['role'].title(),
+        "Cadastro": u['created_at'][:10]
+    } for u in data['items']])
+    st.dataframe(df, hide_index=True, use_container_width=True)
+    show_pagination("users_page", data['total'], page_size)
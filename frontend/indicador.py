@@ -1,6 +1,8 @@
 import streamlit as st
 from auth import get_current_user, make_authenticated_request
 import requests
+import uuid
+from urllib.parse import urlencode
 
 def show_indicador_interface():
     user = get_current_user()
@@ -15,17 +17,20 @@ def show_indicador_interface():
 def show_novo_lead():
     st.header("📋 Novo Lead")
     
-    response = make_authenticated_request("/vendedores/")
+    busca = st.text_input("Buscar vendedor pelo nome")
+    params = urlencode({"q": busca, "limit": 50}) if busca else urlencode({"limit": 50})
+    response = make_authenticated_request(f"/vendedores/?{params}")
     if not response or response.status_code != 200:
         st.error("Erro ao carregar lista de vendedores. Por favor, recarregue a página.")
         return
     
     vendedores = response.json()
-    if not vendedores:
+    if not vendedores and not busca:
         st.warning("Nenhum vendedor disponível no momento.")
         return
     
-    vendedor_options = {f"{v['name']} (ID: {v['id']})": v['id'] for v in vendedores}
+    vendedor_options = {"Automático (vendedor com menos leads em aberto)": None}
+    vendedor_options.update({f"{v['name']} (ID: {v['id']})": v['id'] for v in vendedores})
     
     with st.form("novo_lead_form"):
         client_name = st.text_input("Nome do Cliente *")
@@ -52,7 +57,17 @@ def show_novo_lead():
                     "vendedor_id": vendedor_options[vendedor_selecionado]
                 }
                 
-                response = make_authenticated_request("/leads/", "POST", lead_data)
+                # A chave só é descartada quando o servidor responde, então
+                # reenvios após timeout não criam leads duplicados
+                if 'novo_lead_key' not in st.session_state:
+                    st.session_state.novo_lead_key = str(uuid.uuid4())
+                response = make_authenticated_request(
+                    "/leads/", "POST", lead_data,
+                    headers={"Idempotency-Key": st.session_state.novo_lead_key},
+                    retries=3
+                )
+                if response is not None:
+                    del st.session_state.novo_lead_key
                 if response and response.status_code == 200:
                     st.success("Lead enviado com sucesso!")
                 else:
@@ -61,7 +76,7 @@ def show_novo_lead():
 def show_meus_leads():
     st.header("📊 Meus Leads")
     
-    response = make_authenticated_request("/leads/")
+    response = make_authenticated_request("/leads/?expand=vendedor")
     if response and response.status_code == 200:
         leads = response.json()
         
@@ -86,7 +101,7 @@ def show_meus_leads():
                    <strong>Status:</strong> {lead['status'].replace('_', ' ').title()}</p>
                 <p><strong>Observação:</strong> {lead['observation'] or 'Nenhuma'}</p>
                 <small><strong>Data:</strong> {lead['created_at'][:10]} | 
-                       <strong>Vendedor ID:</strong> {lead.get('vendedor_id', 'N/A')}</small>
+                       <strong>Vendedor:</strong> {(lead.get('vendedor') or {}).get('name', 'N/A')}</small>
             </div>
             """, unsafe_allow_html=True)
     else:
@@ -1,63 +1,127 @@
 import streamlit as st
 from auth import get_current_user, make_authenticated_request
-import pandas as pd
+from components import STATUS_LABELS, show_pagination
+from urllib.parse import urlencode
+
+PAGE_SIZE = 20
 
 def show_vendedor_interface():
     st.header("💼 Painel do Vendedor")
-    
-    response = make_authenticated_request("/leads/")
-    if response and response.status_code == 200:
-        leads = response.json()
-        
-        if not leads:
-            st.info("Nenhum lead atribuído ainda.")
-            return
-        
-        for lead in leads:
-            with st.expander(f"🔹 {lead['client_name']} - {lead['status'].replace('_', ' ').title()}"):
-                col1, col2 = st.columns([2, 1])
-                
-                with col1:
-                    st.write(f"**Telefone:** {lead['phone']}")
-                    st.write(f"**Cidade/Estado:** {lead['city_state']}")
-                    st.write(f"**Observação:** {lead['observation'] or 'Nenhuma'}")
-                    st.write(f"**Data:** {lead['created_at'][:10]}")
-                
-                with col2:
-                    status_options = ["novo", "em_contato", "em_negociacao", "fechado", "perdido"]
-                    status_labels = {
-                        "novo": "Novo",
-                        "em_contato": "Em Contato",
-                        "em_negociacao": "Em Negociação",
-                        "fechado": "Fechado",
-                        "perdido": "Perdido"
-                    }
-                    
-                    current_index = status_options.index(lead['status'])
-                    new_status = st.selectbox(
-                        "Status",
-                        options=status_options,
-                        format_func=lambda x: status_labels[x],
-                        index=current_index,
-                        key=f"status_{lead['id']}"
-                    )
-                    
-                    new_observation = st.text_area(
-                        "Nova Observação",
-                        value=lead['observation'] or "",
-                        key=f"obs_{lead['id']}"
-                    )
-                    
-                    if st.button("Atualizar", key=f"update_{lead['id']}"):
-                        update_data = {
-                            "status": new_status,
-                            "observation": new_observation
-                        }
-                        response = make_authenticated_request(f"/leads/{lead['id']}", "PUT", update_data)
-                        if response and response.status_code == 200:
-                            st.success("Lead atualizado com sucesso!")
-                            st.rerun()
-                        else:
-                            st.error("Erro ao atualizar lead")
-    else:
+
+    response = make_authenticated_request("/leads/counts")
+    if not response or response.status_code != 200:
         st.error("Erro ao carregar leads")
+        return
+
+    counts = response.json()
+    if not any(counts.values()):
+        st.info("Nenhum lead atribuído ainda.")
+        return
+
+    status = st.radio(
+        "Status",
+        options=list(STATUS_LABELS),
+        format_func=lambda x: f"{STATUS_LABELS[x]} ({counts.get(x, 0)})",
+        horizontal=True,
+        key="vendedor_status"
+    )
+    show_status_column(status, counts.get(status, 0))
+
+def show_status_column(status: str, total: int):
+    if total == 0:
+        st.info(f"Nenhum lead com status {STATUS_LABELS[status]}.")
+        return
+
+    # Só a página visível da coluna selecionada é buscada no servidor
+    page_key = f"vendedor_page_{status}"
+    if page_key not in st.session_state:
+        st.session_state[page_key] = 1
+
+    params = urlencode({
+        "status": status,
+        "page": st.session_state[page_key],
+        "page_size": PAGE_SIZE,
+        "sort": "created_at",
+        "order": "desc"
+    })
+    response = make_authenticated_request(f"/leads/search?{params}")
+    if not response or response.status_code != 200:
+        st.error("Erro ao carregar leads")
+        return
+
+    data = response.json()
+    for lead in data['items']:
+        show_lead_row(lead)
+
+    show_pagination(page_key, data['total'], PAGE_SIZE)
+
+def show_lead_row(lead: dict):
+    col1, col2 = st.columns([5, 1])
+    with col1:
+        st.markdown(f"""
+        <div class="lead-card status-{lead['status']}">
+            <strong>{lead['client_name']}</strong> — {lead['phone']} | {lead['city_state']}
+            <br><small><strong>Data:</strong> {lead['created_at'][:10]} |
+            <strong>Observação:</strong> {lead['observation'] or 'Nenhuma'}</small>
+        </div>
+        """, unsafe_allow_html=True)
+    with col2:
+        if st.button("Editar", key=f"edit_{lead['id']}"):
+            st.session_state.editing_lead = lead['id']
+            st.rerun()
+
+    # Os widgets de edição existem apenas para o lead aberto
+    if st.session_state.get('editing_lead') == lead['id']:
+        show_lead_editor(lead)
+
+def show_lead_editor(lead: dict):
+    with st.form(f"editar_lead_{lead['id']}"):
+        status_options = list(STATUS_LABELS)
+        new_status = st.selectbox(
+            "Status",
+            options=status_options,
+            format_func=lambda x: STATUS_LABELS[x],
+            index=status_options.index(lead['status'])
+        )
+        new_observation = st.text_area("Nova Observação", value=lead['observation'] or "")
+
+        col1, col2 = st.columns(2)
+        with col1:
+            submit = st.form_submit_button("Atualizar")
+        with col2:
+            cancel = st.form_submit_button("Cancelar")
+
+        if cancel:
+            st.session_state.editing_lead = None
+            st.rerun()
+
+        if submit:
+            update_data = {
+                "status": new_status,
+                "observation": new_observation
+            }
+            response = make_authenticated_request(
+                f"/leads/{lead['id']}", "PUT", update_data,
+                headers={"If-Match": f'"{lead["version"]}"'},
+                retries=3
+            )
+            if response and response.status_code == 200:
+                st.session_state.editing_lead = None
+                st.success("Lead atualizado com sucesso!")
+                st.rerun()
+            elif response and response.status_code == 409 and lead_has_values(lead['id'], update_data):
+                # Um reenvio após timeout encontra a própria alteração já gravada
+                st.session_state.editing_lead = None
+                st.success("Lead atualizado com sucesso!")
+                st.rerun()
+            elif response and response.status_code == 409:
+                st.warning("Este lead foi alterado por outra pessoa. Feche e abra novamente para ver a versão atual.")
+            else:
+                st.error("Erro ao atualizar lead")
+
+def lead_has_values(lead_id: int, values: dict):
+    response = make_authenticated_request(f"/leads/{lead_id}")
+    if not response or response.status_code != 200:
+        return False
+    current = response.json()
+    return all((current.get(field) or "") == (value or "") for field, value in values.items())